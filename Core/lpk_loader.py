@@ -3,15 +3,18 @@ from typing import Tuple
 import zipfile
 import json
 from Core.utils import *
+from Core import parallel, scheduler
+from Core.profiling import profiler
 import logging
 import os
 
 logger = logging.getLogger("lpkLoder")
 
 class LpkLoader():
-    def __init__(self, lpkpath, configpath) -> None:
+    def __init__(self, lpkpath, configpath, budget: scheduler.MemoryBudget = None) -> None:
         self.lpkpath = lpkpath
         self.configpath = configpath
+        self.budget = budget or scheduler.default_budget
         self.lpkType = None
         self.encrypted = "true"
         self.trans = {}
@@ -57,13 +60,7 @@ class LpkLoader():
                 for i in range(len(chara["costume"])):
                     logger.info(f"extracting {chara_name}_costume_{i}")
                     self.extract_costume(chara["costume"][i], subdir)
-
-                # replace encryped filename to decrypted filename in entrys(model.json)
-                for name in self.entrys:
-                    out_s: str = self.entrys[name]
-                    for k in self.trans:
-                        out_s = out_s.replace(k, self.trans[k])
-                    open(os.path.join(subdir, name), "w", encoding="utf8").write(out_s)
+            logger.debug(f"memory budget: {self.budget.metrics()}")
         else:
             try:
                 print("Deprecated/unknown lpk format detected. Attempting with STD_1_0 format...")
@@ -85,9 +82,15 @@ class LpkLoader():
                         self.lpkfile.extract(file, outputdir)
                     else:
                         print(f"Decrypting {file} -> {outputFilePath}")
-                        decryptedData = self.decrypt_file(file)
-                        with open(outputFilePath, "wb") as outputFile:
-                            outputFile.write(decryptedData)
+                        size = self.lpkfile.getinfo(file).file_size
+                        with self.budget.reserve(scheduler.member_cost(size)):
+                            if size >= scheduler.STREAM_THRESHOLD:
+                                with profiler.stage("stream"):
+                                    self.stream_decrypt(file, outputFilePath)
+                            else:
+                                decryptedData = self.decrypt_file(file)
+                                with profiler.stage("write"), open(outputFilePath, "wb") as outputFile:
+                                    outputFile.write(decryptedData)
             except:
                 logger.fatal(f"Failed to decrypt {self.lpkpath}, possibly wrong/unsupported format.")
                 exit(0)
@@ -109,13 +112,12 @@ class LpkLoader():
             return
 
         subdir = dir
-        entry_s = self.decrypt_file(model_json).decode(encoding="utf8")
-        entry = json.loads(entry_s)
+        entry = json.loads(self.decrypt_file(model_json).decode(encoding="utf8"))
 
-        out_s = json.dumps(entry, ensure_ascii=False)
         id = len(self.entrys)
 
-        self.entrys[f"model{id}.json"] = out_s
+        # reserve the id, the json itself is saved once its members are recovered
+        self.entrys[f"model{id}.json"] = None
 
         self.trans[model_json] = f"model{id}.json"
 
@@ -152,9 +154,26 @@ class LpkLoader():
                     name = self.name_change(name)
                     _, suffix = self.recovery(enc_file, os.path.join(subdir, name))
                     self.trans[enc_file] = name + suffix
-        
+
+        # every file this model references is in trans now
+        # replace encryped filename to decrypted filename in model.json
+        out_s = json.dumps(entry, ensure_ascii=False)
+        for k in self.trans:
+            out_s = out_s.replace(k, self.trans[k])
+        self.save_entry(f"model{id}.json", out_s, dir)
+
         logger.debug(f"========= end of model {model_json} =========")
 
+    def save_entry(self, name: str, out_s: str, dir: str):
+        '''
+        Write a finished model json. Only its path is kept in ``entrys``, so the
+        json strings of earlier models are not held until ``extract`` returns.
+        '''
+        path = os.path.join(dir, name)
+        with profiler.stage("write"), open(path, "w", encoding="utf8") as f:
+            f.write(out_s)
+        self.entrys[name] = path
+
 
     def check_decrypt(self, filename):
         '''
@@ -192,13 +211,68 @@ class LpkLoader():
                     logger.fatal("decrypt failed!")
                     exit(0)
 
-    def recovery(self, filename, output) -> Tuple[bytes, str]:
-        ret = self.decrypt_file(filename)
-        suffix = guess_type(ret)
-        print(f"recovering {filename} -> {output+suffix}")
-        open(output + suffix, "wb").write(ret)
+    def recovery(self, filename, output) -> Tuple[bytearray | None, str]:
+        '''
+        Decrypt a member to ``output`` + guessed suffix.
+
+        Work is admitted by the memory budget from the member size in the zip central directory.
+        Members above ``scheduler.STREAM_THRESHOLD`` are streamed to disk and return ``None`` as data.
+        '''
+        size = self.lpkfile.getinfo(filename).file_size
+        if size >= scheduler.STREAM_THRESHOLD:
+            # json is only validated as a whole, so only members that can be json pay for it
+            maybe_json = looks_like_json(self.decrypt_head(filename))
+            cost = scheduler.json_cost(size) if maybe_json else scheduler.member_cost(size)
+            with self.budget.reserve(cost), profiler.stage("stream"):
+                return None, self.recovery_stream(filename, output, maybe_json)
+        with self.budget.reserve(scheduler.member_cost(size)):
+            ret = self.decrypt_file(filename)
+            with profiler.stage("sniff"):
+                suffix = guess_type(ret)
+            print(f"recovering {filename} -> {output+suffix}")
+            with profiler.stage("write"), open(output + suffix, "wb") as f:
+                f.write(ret)
         return ret, suffix
 
+    def decrypt_head(self, filename, size: int = 1024) -> bytearray:
+        with self.lpkfile.open(filename) as f:
+            return decrypt(self.getkey(filename), f.read(size))
+
+    def recovery_stream(self, filename, output, maybe_json: bool) -> str:
+        suffix = self.stream_decrypt(filename, output, sniff=True)
+        # json can only be recognised as a whole, check the written file
+        if suffix == "" and maybe_json:
+            try:
+                with open(output, "r", encoding="utf-8-sig") as f:
+                    json.load(f)
+                os.replace(output, output + ".json")
+                suffix = ".json"
+            except (UnicodeDecodeError, ValueError):
+                pass
+        return suffix
+
+    def stream_decrypt(self, filename, output, sniff: bool = False) -> str:
+        '''
+        Decrypt a member chunk by chunk into ``output``. The keystream restarts every
+        1024 bytes, so chunks aligned to that decrypt exactly like the whole member.
+        With ``sniff`` the suffix guessed from the first chunk is appended to ``output``.
+        '''
+        key = self.getkey(filename)
+        size = self.lpkfile.getinfo(filename).file_size
+        with self.lpkfile.open(filename) as src:
+            data = decrypt(key, src.read(scheduler.STREAM_CHUNK))
+            suffix = guess_type(data) if sniff else ""
+            print(f"recovering {filename} -> {output+suffix} (streamed)")
+            with open(output + suffix, "wb") as dst:
+                dst.write(data)
+                if not parallel.use_parallel(size):
+                    while chunk := src.read(scheduler.STREAM_CHUNK):
+                        dst.write(decrypt(key, chunk))
+            # huge members: worker processes write the remaining ranges at their offsets
+            if parallel.use_parallel(size):
+                parallel.decrypt_stream_to_file(key, src, output + suffix, len(data))
+        return suffix
+
     def getkey(self, file: str):
         if self.lpkType == "STM_1_0" and self.mlve_config["encrypt"] != "true":
             return 0
@@ -213,13 +287,35 @@ class LpkLoader():
         #else:
             raise Exception(f"not support type {self.mlve_config['type']}")
 
-    def decrypt_file(self, filename) -> bytes:
-        data = self.lpkfile.read(filename)
+    def decrypt_file(self, filename) -> bytearray:
+        size = self.lpkfile.getinfo(filename).file_size
+        if parallel.use_parallel(size):
+            # inflated into the shared buffer of the workers, never held twice here
+            with profiler.stage("decrypt"), self.lpkfile.open(filename) as f:
+                return parallel.decrypt_parallel(self.getkey(filename), f, size)
+        with profiler.stage("inflate"):
+            data = self.inflate_member(filename)
         return self.decrypt_data(filename, data)
 
-    def decrypt_data(self, filename: str, data: bytes) -> bytes:
+    def inflate_member(self, filename) -> bytearray:
+        '''
+        Inflate a member into a buffer sized from the central directory,
+        chunk by chunk instead of ``ZipFile.read`` joining whole copies.
+        '''
+        data = bytearray(self.lpkfile.getinfo(filename).file_size)
+        view = memoryview(data)
+        pos = 0
+        with self.lpkfile.open(filename) as f:
+            while chunk := f.read(scheduler.STREAM_CHUNK):
+                view[pos:pos+len(chunk)] = chunk
+                pos += len(chunk)
+        view.release()
+        return data
+
+    def decrypt_data(self, filename: str, data: bytes) -> bytearray:
         key = self.getkey(filename)
-        return decrypt(key, data)
+        with profiler.stage("decrypt"):
+            return decrypt(key, data)
     
     def name_change(self, name: str) -> str:
         #去除name里面的FileReferences_
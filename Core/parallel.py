@@ -0,0 +1,114 @@
+import os
+
+from Core.utils import decrypt
+
+# members at or above this size are decrypted on several processes
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+# bytes decrypted per task, a multiple of the 1024 byte cipher block
+RANGE_SIZE = 1024 * 1024
+
+# jobs running at the same time (GUI job queue workers), they share the cores
+job_workers = 1
+
+
+def set_job_workers(n: int):
+    global job_workers
+    job_workers = max(1, n)
+
+
+def workers() -> int:
+    return max(1, (os.cpu_count() or 1) // job_workers)
+
+
+def use_parallel(size: int) -> bool:
+    return size >= PARALLEL_THRESHOLD and workers() > 1
+
+
+def process_pool(max_workers: int = None):
+    '''
+    Process pool started with spawn, forking a process with running threads (Tk, job queue) is unsafe.
+    '''
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=max_workers or workers(), mp_context=multiprocessing.get_context("spawn"))
+
+
+def in_flight() -> int:
+    # ranges read ahead of the workers on the file path
+    return 2 * workers()
+
+
+def block_ranges(size: int, range_size: int = None) -> list:
+    """
+    Split ``size`` bytes into (start, end) ranges aligned to the cipher block.
+    """
+    range_size = range_size or RANGE_SIZE
+    range_size = max(1024, range_size - range_size % 1024)
+    return [(i, min(i + range_size, size)) for i in range(0, size, range_size)]
+
+
+def _decrypt_shared(name: str, key: int, start: int, end: int):
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        shm.buf[start:end] = decrypt(key, bytes(shm.buf[start:end]))
+    finally:
+        shm.close()
+
+
+def _decrypt_at(path: str, offset: int, key: int, data: bytes):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(decrypt(key, data))
+
+
+def decrypt_parallel(key: int, src, size: int) -> bytearray:
+    """
+    Same result as ``decrypt`` on the ``size`` bytes of the file-like ``src``.
+
+    The member is inflated straight into a shared buffer where block aligned ranges
+    are decrypted in place by independent processes (the keystream restarts every
+    1024 bytes), then copied out once: peak memory is twice the member.
+    """
+    if size == 0:
+        return bytearray()
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        pos = 0
+        while chunk := src.read(RANGE_SIZE):
+            shm.buf[pos:pos+len(chunk)] = chunk
+            pos += len(chunk)
+        with process_pool() as pool:
+            futures = [pool.submit(_decrypt_shared, shm.name, key, start, end)
+                       for start, end in block_ranges(size)]
+            for f in futures:
+                f.result()
+        return bytearray(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def decrypt_stream_to_file(key: int, src, path: str, offset: int = 0):
+    """
+    Decrypt the rest of the file-like ``src`` into ``path`` starting at ``offset``.
+
+    Ranges are read serially (zip members inflate sequentially) and written by worker
+    processes directly at their file offsets, with at most ``in_flight()`` ranges pending.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    with process_pool() as pool:
+        pending = set()
+        while True:
+            data = src.read(RANGE_SIZE)
+            if not data:
+                break
+            pending.add(pool.submit(_decrypt_at, path, offset, key, data))
+            offset += len(data)
+            if len(pending) >= in_flight():
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    f.result()
+        for f in pending:
+            f.result()
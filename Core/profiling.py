@@ -0,0 +1,156 @@
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# interval of the background RSS sampler
+RSS_INTERVAL = 0.01
+TOP_ALLOCATORS = 10
+
+
+_psutil = None
+
+def rss() -> int | None:
+    """
+    Resident set size of this process in bytes, None when it can not be read.
+    psutil is used when installed, otherwise /proc on Linux.
+    """
+    global _psutil
+    if _psutil is None:
+        try:
+            import psutil
+            _psutil = psutil
+        except ImportError:
+            _psutil = False
+    if _psutil:
+        return _psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class StageStats():
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_traced = 0
+        self.peak_rss = 0
+
+
+class MemoryProfiler():
+    """
+    Per pipeline stage peak memory, from tracemalloc and a sampled RSS.
+
+    Stages cost nothing while the profiler is disabled. Peaks are process wide,
+    so stages are only attributed exactly when a single pack is processed.
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.current_rss = 0
+        self.peak_rss = 0
+        # running maximum of the sampler since the last stage started
+        self.stage_peak_rss = 0
+        self.peak_traced = 0
+        self.peak_snapshot = None
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def enable(self, frames: int = 1):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.stages = {}
+        self.peak_rss = 0
+        self.peak_traced = 0
+        self.peak_snapshot = None
+        tracemalloc.start(frames)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._sampler.join()
+        tracemalloc.stop()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            value = rss()
+            if value is not None:
+                self.current_rss = value
+                self.peak_rss = max(self.peak_rss, value)
+                self.stage_peak_rss = max(self.stage_peak_rss, value)
+            self._stop.wait(RSS_INTERVAL)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        tracemalloc.reset_peak()
+        self.stage_peak_rss = rss() or 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            # spikes freed before the stage ends are caught by the sampler
+            stage_rss = max(self.stage_peak_rss, rss() or 0)
+            with self.lock:
+                stats = self.stages.setdefault(name, StageStats(name))
+                stats.calls += 1
+                stats.seconds += seconds
+                stats.peak_traced = max(stats.peak_traced, peak)
+                stats.peak_rss = max(stats.peak_rss, stage_rss)
+                if peak > self.peak_traced:
+                    self.peak_traced = peak
+                    # allocations still alive at the end of the stage with the highest peak
+                    self.peak_snapshot = (name, tracemalloc.take_snapshot())
+
+    def profiled(self, name: str):
+        """
+        Decorator running a whole function as one stage.
+        """
+        def wrap(func):
+            @functools.wraps(func)
+            def inner(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return inner
+        return wrap
+
+    def report(self) -> str:
+        lines = ["%-12s %6s %9s %14s %14s" % ("stage", "calls", "seconds", "peak traced", "peak rss")]
+        for stats in sorted(self.stages.values(), key=lambda s: -s.peak_traced):
+            lines.append("%-12s %6d %9.3f %14s %14s" % (
+                stats.name, stats.calls, stats.seconds, format_bytes(stats.peak_traced), format_bytes(stats.peak_rss)))
+        lines.append(f"peak traced: {format_bytes(self.peak_traced)}, peak rss: {format_bytes(self.peak_rss)}")
+        if self.peak_snapshot is not None:
+            name, snapshot = self.peak_snapshot
+            lines.append(f"largest allocators at the end of the peak '{name}' stage:")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATORS]:
+                lines.append(f"  {format_bytes(stat.size):>10}  {stat.traceback}")
+        return "\n".join(lines)
+
+
+def format_bytes(n: int) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+# shared by the loader and SetupModel, enabled by memprofile.py
+profiler = MemoryProfiler()
@@ -0,0 +1,89 @@
+import threading
+from contextlib import contextmanager
+
+from Core import parallel
+
+# members at or above this size are decrypted chunk by chunk straight to disk
+STREAM_THRESHOLD = 32 * 1024 * 1024
+# chunk size of the streaming path, a multiple of the 1024 byte cipher block
+STREAM_CHUNK = 1024 * 1024
+# bytes held per member byte while decrypting in memory: the raw member and the result
+DECRYPT_OVERHEAD = 2
+# bytes held per member byte while a streamed member is checked for json:
+# the decoded text and the parsed values, numbers parse to several times their text
+JSON_OVERHEAD = 6
+
+
+def json_cost(size: int) -> int:
+    """
+    Estimated peak memory for loading a streamed member of ``size`` bytes as json.
+    """
+    return size * JSON_OVERHEAD
+
+
+def member_cost(size: int) -> int:
+    """
+    Estimated peak memory for decrypting a member of ``size`` bytes.
+    """
+    if parallel.use_parallel(size):
+        # ranges read ahead in this process plus one range being decrypted per worker
+        return parallel.RANGE_SIZE * (parallel.in_flight() + parallel.workers() * DECRYPT_OVERHEAD)
+    if size >= STREAM_THRESHOLD:
+        return STREAM_CHUNK * DECRYPT_OVERHEAD
+    return size * DECRYPT_OVERHEAD
+
+
+class MemoryBudget():
+    """
+    Admits decryption work while the estimated bytes in flight stay under a global budget.
+
+    A reservation larger than the whole budget is not rejected but runs alone.
+    """
+    def __init__(self, budget_bytes: int = 1024 * 1024 * 1024) -> None:
+        self.budget_bytes = budget_bytes
+        self.cond = threading.Condition()
+        self.queued = 0
+        self.queued_bytes = 0
+        self.running = 0
+        self.running_bytes = 0
+        self.peak_bytes = 0
+
+    def set_budget(self, budget_bytes: int):
+        with self.cond:
+            self.budget_bytes = budget_bytes
+            self.cond.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        with self.cond:
+            self.queued += 1
+            self.queued_bytes += nbytes
+            while self.running and self.running_bytes + nbytes > self.budget_bytes:
+                self.cond.wait()
+            self.queued -= 1
+            self.queued_bytes -= nbytes
+            self.running += 1
+            self.running_bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.running_bytes)
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.running -= 1
+                self.running_bytes -= nbytes
+                self.cond.notify_all()
+
+    def metrics(self) -> dict:
+        with self.cond:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "queued": self.queued,
+                "queued_bytes": self.queued_bytes,
+                "running": self.running,
+                "running_bytes": self.running_bytes,
+                "peak_bytes": self.peak_bytes,
+            }
+
+
+# shared by every loader so concurrent jobs stay under one budget
+default_budget = MemoryBudget()
@@ -2,8 +2,6 @@ from hashlib import md5
 import os
 import re
 import json
-import filetype
-from filetype.types import Type
 
 def hashed_filename(s: str) -> str:
     t = md5()
@@ -33,15 +31,30 @@ def genkey(s: str) -> int:
         ret = ret | 0xffffffff00000000
     return ret
 
-def decrypt(key: int, data: bytes) -> bytes:
-    ret = []
-    for slice in [data[i:i+1024] for i in range(0, len(data), 1024)]:
-        tmpkey = key
-        for i in slice:
-            tmpkey = (65535 & 2531011 + 214013 * tmpkey >> 16) & 0xffffffff
-            ret.append((tmpkey & 0xff) ^ i)
+def keystream(key: int) -> bytes:
+    """
+    The 1024 byte keystream, it restarts from ``key`` at every block
+    """
+    ret = bytearray(1024)
+    tmpkey = key
+    for i in range(1024):
+        tmpkey = (65535 & 2531011 + 214013 * tmpkey >> 16) & 0xffffffff
+        ret[i] = tmpkey & 0xff
     return bytes(ret)
 
+# bytes xor-ed at once, a multiple of the 1024 byte block
+XOR_STEP = 64 * 1024
+
+def decrypt(key: int, data: bytes) -> bytearray:
+    # the output buffer is the only allocation proportional to the member
+    ret = bytearray(len(data))
+    pad = keystream(key) * (XOR_STEP // 1024)
+    for start in range(0, len(data), XOR_STEP):
+        chunk = data[start:start+XOR_STEP]
+        n = len(chunk)
+        ret[start:start+n] = (int.from_bytes(chunk, "little") ^ int.from_bytes(pad[:n], "little")).to_bytes(n, "little")
+    return ret
+
 match_rule = re.compile(r"[0-9a-f]{32}.bin3?")
 def is_encrypted_file(s: str) -> bool:
     if type(s) != str:
@@ -92,33 +105,54 @@ def travels_list(vals: list):
             yield str(i), vals[i]
 
 
-class Moc3(Type):
-    MIME = "application/moc3"
-    EXTENSION = "moc3"
-    def __init__(self):
-        super(Moc3, self).__init__(mime=Moc3.MIME, extension=Moc3.EXTENSION)
-    
-    def match(self, buf):
-        return len(buf) > 3 and buf.startswith(b"MOC3")
+_filetype = None
+
+def load_filetype():
+    """
+    Import filetype and register the Live2D moc types on first use
+    """
+    global _filetype
+    if _filetype is not None:
+        return _filetype
+    import filetype
+    from filetype.types import Type
+
+    class Moc3(Type):
+        MIME = "application/moc3"
+        EXTENSION = "moc3"
+        def __init__(self):
+            super(Moc3, self).__init__(mime=Moc3.MIME, extension=Moc3.EXTENSION)
+
+        def match(self, buf):
+            return len(buf) > 3 and buf.startswith(b"MOC3")
+
+    class Moc(Type):
+        MIME = "application/moc"
+        EXTENSION = "moc"
+        def __init__(self):
+            super(Moc, self).__init__(mime=Moc.MIME, extension=Moc.EXTENSION)
 
-class Moc(Type):
-    MIME = "application/moc"
-    EXTENSION = "moc"
-    def __init__(self):
-        super(Moc, self).__init__(mime=Moc.MIME, extension=Moc.EXTENSION)
-    
-    def match(self, buf):
-        return len(buf) > 3 and buf.startswith(b"moc")
+        def match(self, buf):
+            return len(buf) > 3 and buf.startswith(b"moc")
 
-filetype.add_type(Moc3())
-filetype.add_type(Moc())
+    filetype.add_type(Moc3())
+    filetype.add_type(Moc())
+    _filetype = filetype
+    return _filetype
 
 def guess_type(data: bytes):
-    ftype = filetype.guess(data)
+    ftype = load_filetype().guess(data)
     if ftype != None:
         return "." + ftype.extension
     try:
         json.loads(data.decode("utf8"))
         return ".json"
     except:
-        return ""
\ No newline at end of file
+        return ""
+
+def looks_like_json(head: bytes) -> bool:
+    """
+    Whether a member starting with ``head`` can be a json document (object or array).
+    """
+    head = bytes(head).removeprefix(b"\xef\xbb\xbf").lstrip()
+    return head == b"" or head[:1] in [b"{", b"["]
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import Callable
+
+import manager
+from Core import parallel
+from Core.lpk_loader import LpkLoader
+from Core.utils import normalize
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def find_lpks(path: str) -> list:
+    """
+    .lpk files for a dropped path: the file itself, or every .lpk under a folder.
+    """
+    if os.path.isfile(path):
+        return [path] if path.lower().endswith(".lpk") else []
+    found = []
+    for root, _, files in os.walk(path):
+        for fname in sorted(files):
+            if fname.lower().endswith(".lpk"):
+                found.append(os.path.join(root, fname))
+    return found
+
+
+def find_config(lpk_path: str) -> str:
+    config_path = os.path.join(os.path.dirname(lpk_path), "config.json")
+    return config_path if os.path.exists(config_path) else ""
+
+
+def model_name_for(lpk_path: str, config_path: str) -> str:
+    if config_path:
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                title = json.load(f).get("title")
+            if title:
+                return normalize(title.replace("\\", "").replace("/", ""))
+        except Exception as e:
+            print(e)
+    return normalize(os.path.splitext(os.path.basename(lpk_path))[0])
+
+
+class Job():
+    """
+    One lpk conversion. Worker threads only update these attributes, the GUI polls them.
+    """
+    def __init__(self, lpk_path: str, output_dir: str, config_path: str = None, model_name: str = None) -> None:
+        self.lpk_path = lpk_path
+        self.config_path = find_config(lpk_path) if config_path is None else config_path
+        self.model_name = model_name or model_name_for(lpk_path, self.config_path)
+        self.output_dir = output_dir
+        self.status = QUEUED
+        self.stage = ""
+        self.progress = 0.0
+        self.error = None
+        self.cancel_event = threading.Event()
+
+    def check_cancel(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobLoader(LpkLoader):
+    """
+    LpkLoader reporting progress and honouring cancellation between members.
+    """
+    def __init__(self, job: Job) -> None:
+        self.job = job
+        self.recovered = 0
+        super().__init__(job.lpk_path, job.config_path)
+        self.total = max(len(self.lpkfile.namelist()), 1)
+
+    def recovery(self, filename, output):
+        self.job.check_cancel()
+        ret = super().recovery(filename, output)
+        self.recovered += 1
+        # extraction is reported as the first 80% of a job
+        self.job.progress = min(self.recovered / self.total, 1.0) * 0.8
+        return ret
+
+
+class JobQueue():
+    """
+    Runs jobs on at most ``workers`` threads. The worker count can be changed at any time.
+    """
+    def __init__(self, workers: int = 2, on_finish: Callable[[Job], None] = None) -> None:
+        self.workers = workers
+        parallel.set_job_workers(workers)
+        self.on_finish = on_finish
+        self.jobs: list = []
+        self.pending: deque = deque()
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def set_workers(self, workers: int):
+        with self.lock:
+            self.workers = max(1, workers)
+        # process pools of the running jobs split the cores between them
+        parallel.set_job_workers(self.workers)
+        self._schedule()
+
+    def submit(self, job: Job) -> Job:
+        with self.lock:
+            # two packs with the same name would be renamed onto the same folder
+            names = {(j.output_dir, j.model_name) for j in self.jobs if j.status in [QUEUED, RUNNING]}
+            base, n = job.model_name, 2
+            while (job.output_dir, job.model_name) in names:
+                job.model_name = f"{base}_{n}"
+                n += 1
+            self.jobs.append(job)
+            self.pending.append(job)
+        self._schedule()
+        return job
+
+    def cancel(self, job: Job):
+        job.cancel_event.set()
+        with self.lock:
+            if job.status == QUEUED:
+                self.pending.remove(job)
+                job.status = CANCELLED
+
+    def active(self) -> int:
+        with self.lock:
+            return self.running + len(self.pending)
+
+    def _schedule(self):
+        with self.lock:
+            while self.pending and self.running < self.workers:
+                job = self.pending.popleft()
+                job.status = RUNNING
+                self.running += 1
+                threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job: Job):
+        try:
+            job.check_cancel()
+            job.stage = "extracting"
+            loader = JobLoader(job)
+            loader.extract(job.output_dir, job.model_name)
+            job.check_cancel()
+            job.stage = "setting up model"
+            job.progress = 0.8
+            manager.SetupModel(os.path.join(job.output_dir, normalize(job.model_name)), job.model_name)
+            job.stage = ""
+            job.progress = 1.0
+            job.status = DONE
+            manager.Log("Extraction complete: %s" % job.lpk_path)
+        except JobCancelled:
+            job.status = CANCELLED
+            manager.Log("Cancelled: %s" % job.lpk_path)
+        # the loader calls exit() on unrecoverable packs
+        except SystemExit:
+            job.error = "failed to decrypt, possibly wrong/unsupported format"
+            job.status = FAILED
+            manager.Log("Error occurred in %s: %s\nExtraction stopped." % (job.lpk_path, job.error))
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            manager.Log("Error occurred in %s: %s\nExtraction stopped." % (job.lpk_path, e))
+        with self.lock:
+            self.running -= 1
+        if self.on_finish is not None:
+            self.on_finish(job)
+        self._schedule()
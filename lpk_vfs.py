@@ -0,0 +1,262 @@
+import argparse
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import unquote, urlsplit
+
+import manager
+import motion_spec
+from Core.lpk_loader import LpkLoader
+from Core.utils import decrypt, guess_type, normalize
+
+logger = logging.getLogger("lpkVFS")
+
+# how much of a member is decrypted to sniff its file type while indexing
+HEAD_SIZE = 1024
+# reference names (after LpkLoader.name_change) that always point to json files
+JSON_REFERENCE = re.compile(r"^(Motions_.*_File|Expressions_.*_File|Physics|Pose|UserData|DisplayInfo)_\d+$")
+
+
+class LRUCache():
+    """
+    Thread safe LRU cache of decrypted members, bounded by total bytes.
+
+    Entries are read-only memoryviews, so callers sharing an entry can not change it.
+    """
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.items: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> memoryview | None:
+        with self.lock:
+            data = self.items.get(key)
+            if data is not None:
+                self.items.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> memoryview:
+        """
+        Cache ``data`` and return the read-only view that callers should use.
+        """
+        data = memoryview(data).toreadonly()
+        # a member larger than the whole budget is served but never cached
+        if len(data) > self.max_bytes:
+            return data
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+        return data
+
+
+class LpkVirtualFS(LpkLoader):
+    """
+    Read-only view of a .lpk under the file names SetupModel would produce.
+
+    Only model jsons and the head of each member are decrypted while indexing,
+    everything else is decrypted on first access and kept in an LRU cache.
+    Sounds keep their original format since no ffmpeg conversion happens here.
+    """
+    def __init__(self, lpkpath, configpath, model_name: str = None, cache_bytes: int = 128 * 1024 * 1024) -> None:
+        super().__init__(lpkpath, configpath)
+        self.cache = LRUCache(cache_bytes)
+        # local (extracted) name -> encrypted member
+        self.members = {}
+        # final path -> (kind, source); kind is "generated", "member" or "motion"
+        self.files = {}
+        self.generated = {}
+        self.model_name = model_name
+        self.build_index()
+
+    def build_index(self):
+        if self.lpkType not in ["STD2_0", "STM_1_0"]:
+            raise Exception(f"virtual filesystem does not support type {self.lpkType}")
+
+        for chara in self.mlve_config["list"]:
+            if not self.model_name:
+                # SetupModel names an unnamed model after its extracted folder
+                if self.lpkType == "STM_1_0" and 'title' in self.config:
+                    self.model_name = normalize(self.config["title"])
+                else:
+                    self.model_name = normalize(chara["character"] if chara["character"] != "" else "character")
+            for costume in chara["costume"]:
+                if costume["path"] == "":
+                    continue
+                self.check_decrypt(costume["path"])
+                self.extract_model_json(costume["path"], "")
+
+        for name, member in self.members.items():
+            self.files[name] = ("member", member)
+
+        texture_folder = None
+        for idx, name in enumerate(self.entrys):
+            x = json.loads(self.entrys[name])
+            modelName = normalize(self.model_name + ("" if idx == 0 else str(idx+1)))
+
+            motions = x["FileReferences"].get("Motions", {})
+            for groupName in motions:
+                for motion in motions[groupName]:
+                    _File: str | None = motion.get("File", None)
+                    _Sound: str | None = motion.get("Sound", None)
+                    if _File and _File in self.members:
+                        path = "motions/" + manager.motion_file_name(_File, modelName)
+                        self.files.pop(_File, None)
+                        self.files[path] = ("motion", self.members[_File])
+                        motion["File"] = path
+                    if _Sound and _Sound in self.members:
+                        path = "sounds/" + manager.sound_file_name(_Sound, modelName, os.path.splitext(_Sound)[1])
+                        self.files.pop(_Sound, None)
+                        self.files[path] = ("member", self.members[_Sound])
+                        motion["Sound"] = path
+            manager.link_hit_areas(x)
+
+            textures = x["FileReferences"].get("Textures", [])
+            first = next((tex for tex in textures if tex in self.members), None)
+            if texture_folder is None and first is not None:
+                # named like organize_textures_for_all_models, from the unnormalized base name
+                texture_folder = f"{self.model_name}.{self.texture_width(first)}"
+            for i, tex in enumerate(textures):
+                if tex not in self.members:
+                    continue
+                path = f"{texture_folder}/{os.path.basename(tex)}"
+                self.files.pop(tex, None)
+                self.files[path] = ("member", self.members[tex])
+                textures[i] = path
+
+            path = modelName + ".model3.json"
+            self.generated[path] = json.dumps(x, ensure_ascii=False, indent=2).encode("utf8")
+            self.files[path] = ("generated", path)
+
+        logger.info(f"indexed {len(self.files)} files from {self.lpkpath}")
+
+    def recovery(self, filename, output) -> Tuple[bytearray, str]:
+        # index the member instead of writing it, sniffing the type from its first block
+        with self.lpkfile.open(filename) as f:
+            head = f.read(HEAD_SIZE)
+        data = decrypt(self.getkey(filename), head)
+        suffix = guess_type(data)
+        # json can only be recognised as a whole, the reference key tells instead;
+        # anything else unrecognised stays without suffix rather than being decrypted now
+        if suffix == "" and JSON_REFERENCE.match(output):
+            suffix = ".json"
+        self.members[output + suffix] = filename
+        return data, suffix
+
+    def save_entry(self, name: str, out_s: str, dir: str):
+        # nothing is written, model jsons are rebuilt into model3.json in memory
+        self.entrys[name] = out_s
+
+    def texture_width(self, name: str) -> int:
+        member = self.members[name]
+        with self.lpkfile.open(member) as f:
+            head = decrypt(self.getkey(member), f.read(24))
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            return int.from_bytes(head[16:20], "big")
+        import PIL.Image
+        with PIL.Image.open(io.BytesIO(self.read_member(member))) as img:
+            return img.width
+
+    def read_member(self, member: str) -> memoryview:
+        data = self.cache.get(member)
+        if data is None:
+            data = self.cache.put(member, self.decrypt_file(member))
+        return data
+
+    def listdir(self) -> list:
+        return sorted(self.files)
+
+    def exists(self, path: str) -> bool:
+        return path in self.files
+
+    def read(self, path: str) -> bytes | memoryview:
+        '''
+        Read a file by its final path, raises ``FileNotFoundError`` for unknown paths.
+        Members are returned as read-only views shared with the cache.
+        '''
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        kind, source = self.files[path]
+        if kind == "generated":
+            return self.generated[source]
+        if kind == "motion":
+            data = self.cache.get(path)
+            if data is None:
+                src = json.loads(str(self.read_member(source), "utf8"))
+                motion_spec.update_motion_meta(src)
+                data = self.cache.put(path, json.dumps(src, ensure_ascii=False, indent=2).encode("utf8"))
+            return data
+        return self.read_member(source)
+
+
+def make_handler(vfs: LpkVirtualFS):
+    class Handler(BaseHTTPRequestHandler):
+        def send_body(self, with_body: bool):
+            path = unquote(urlsplit(self.path).path).lstrip("/")
+            if path == "":
+                data = json.dumps(vfs.listdir(), ensure_ascii=False).encode("utf8")
+                ctype = "application/json"
+            elif vfs.exists(path):
+                data = vfs.read(path)
+                ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            # web viewers usually run on another origin
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            if with_body:
+                self.wfile.write(data)
+
+        def do_GET(self):
+            self.send_body(True)
+
+        def do_HEAD(self):
+            self.send_body(False)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return Handler
+
+
+def serve(vfs: LpkVirtualFS, host: str = "127.0.0.1", port: int = 8000):
+    '''
+    Serve a virtual filesystem over HTTP until interrupted. ``GET /`` lists all paths.
+    '''
+    server = ThreadingHTTPServer((host, port), make_handler(vfs))
+    print(f"serving {vfs.lpkpath} on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a .lpk model to Live2D web viewers without extracting it")
+    parser.add_argument("lpk")
+    parser.add_argument("--config", default="", help="config.json, needed for steam workshop packs")
+    parser.add_argument("--name", default=None, help="model name")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-mb", type=int, default=128)
+    args = parser.parse_args()
+    serve(LpkVirtualFS(args.lpk, args.config, args.name, args.cache_mb * 1024 * 1024), args.host, args.port)
@@ -1,14 +1,13 @@
 import json
+import multiprocessing
 import os
 import customtkinter as ctk
 from tkinterdnd2 import TkinterDnD, DND_FILES  # <-- Add this import
 from tkinter import filedialog, messagebox
-from threading import Thread
+import jobs
 import manager
-from Core.lpk_loader import LpkLoader
-from Core.utils import normalize, safe_mkdir
 
-currentThread = None
+POLL_MS = 100
 
 
 class Win(ctk.CTk, TkinterDnD.DnDWrapper):  # <-- Inherit from DnDWrapper
@@ -19,19 +18,24 @@ class Win(ctk.CTk, TkinterDnD.DnDWrapper):  # <-- Inherit from DnDWrapper
         ctk.set_default_color_theme("green")
         self.title("LPK Model Extractor")
         self._width = 570
-        self._height = 450
+        self._height = 650
         self.geometry(f"{self._width}x{self._height}")
         self.resizable(width=False, height=False)
         self.inputPath = ctk.StringVar()
         self.outputPath = ctk.StringVar()
         self.configPath = ctk.StringVar()
         self.modelNameVar = ctk.StringVar(value="character")
+        self.workersVar = ctk.StringVar(value="2 workers")
+        self.queue = jobs.JobQueue(2)
+        self.jobRows = {}
         self.setupUI()
         manager.Log("Instructions\n"
                     "Models exported from Live2DViewerEX are in .wpk format\n"
                     "First, change the extension to .rar and extract to get .lpk and config.json files\n"
                     "If the model is not from EXViewer, you do not need to provide config.json\n"
-                    "Model name can be customized, supports Chinese, but English is recommended")
+                    "Model name can be customized, supports Chinese, but English is recommended\n"
+                    "Drop several .lpk files or folders to queue them, each uses the config.json next to it")
+        self.after(POLL_MS, self.poll)
 
     def setupUI(self):
         padding = 10
@@ -48,7 +52,12 @@ class Win(ctk.CTk, TkinterDnD.DnDWrapper):  # <-- Inherit from DnDWrapper
         self.lbl_modelName = ctk.CTkLabel(self, text="Model Name")
         self.modelName = ctk.CTkEntry(self, textvariable=self.modelNameVar, width=300)
         self.getUnpack = ctk.CTkButton(self, text="Extract", command=self.Unpack, width=120)
+        self.workers = ctk.CTkOptionMenu(self, variable=self.workersVar,
+                                         values=["1 worker"] + [f"{i} workers" for i in range(2, 9)],
+                                         command=self.setWorkers, width=120)
         self.logArea = ctk.CTkTextbox(self, width=540, height=120)
+        self.jobList = ctk.CTkScrollableFrame(self, width=520, height=150, label_text="Jobs")
+        self.jobList.grid_columnconfigure(0, weight=1)
         manager.LogArea = self.logArea
 
         # Place widgets with padding and spacing
@@ -66,10 +75,13 @@ class Win(ctk.CTk, TkinterDnD.DnDWrapper):  # <-- Inherit from DnDWrapper
 
         self.lbl_modelName.grid(row=3, column=0, padx=padding, pady=(padding, 0), sticky="w")
         self.modelName.grid(row=3, column=1, padx=padding, pady=(padding, 0), sticky="ew")
+        self.workers.grid(row=3, column=2, padx=padding, pady=(padding, 0))
 
         self.logArea.grid(row=4, column=0, columnspan=3, padx=padding, pady=(padding, 0), sticky="ew")
 
-        self.getUnpack.grid(row=5, column=1, padx=padding, pady=(padding, padding))
+        self.getUnpack.grid(row=5, column=1, padx=padding, pady=(padding, 0))
+
+        self.jobList.grid(row=6, column=0, columnspan=3, padx=padding, pady=(padding, padding), sticky="ew")
 
         # --- Drag & Drop support ---
         self.input.drop_target_register(DND_FILES)
@@ -78,9 +90,23 @@ class Win(ctk.CTk, TkinterDnD.DnDWrapper):  # <-- Inherit from DnDWrapper
         self.config.dnd_bind('<<Drop>>', self.on_drop_config)
         self.output.drop_target_register(DND_FILES)
         self.output.dnd_bind('<<Drop>>', self.on_drop_output)
+        self.jobList.drop_target_register(DND_FILES)
+        self.jobList.dnd_bind('<<Drop>>', self.on_drop_jobs)
+
+    def on_drop_jobs(self, event):
+        for path in self.tk.splitlist(event.data):
+            for lpk in jobs.find_lpks(path):
+                self.addJob(jobs.Job(lpk, self.output.get() or os.path.join(os.path.dirname(lpk), "output")))
 
     def on_drop_lpk(self, event):
-        path = event.data.replace("{", "").replace("}", "")
+        paths = self.tk.splitlist(event.data)
+        if not paths:
+            return
+        # several packs or a folder go straight to the job queue
+        if len(paths) > 1 or os.path.isdir(paths[0]):
+            self.on_drop_jobs(event)
+            return
+        path = paths[0]
         if path.lower().endswith(".lpk"):
             self.inputPath.set(path)
             folder = os.path.dirname(path)
@@ -159,51 +185,54 @@ class Win(ctk.CTk, TkinterDnD.DnDWrapper):  # <-- Inherit from DnDWrapper
             self.outputPath.set(output_folder)
             self.updateModelNameFromConfig()
 
+    def setWorkers(self, value: str):
+        self.queue.set_workers(int(value.split()[0]))
+
     def Unpack(self):
-        global currentThread
-        if currentThread is not None:
-            messagebox.showwarning("LPK Model Extractor", "Extraction is already in progress, please wait")
-            return
-        self.logArea.configure(state="normal")
-        self.logArea.delete("1.0", "end")
-        currentThread = Thread(target=self._unpack)
-        currentThread.start()
-
-    def _unpack(self):
-        global currentThread
-        if len(self.output.get()) > 0 and len(self.input.get()) > 0:
-            manager.Log(
-                "LPK File: %s\nOutput Path: %s"
-                % (self.input.get(), self.output.get())
-            )
-            try:
-                loader = LpkLoader(self.input.get(), self.config.get())
-                # Pass the custom name to extract
-                loader.extract(self.output.get(), self.modelNameVar.get())
-                # Find the actual extracted folder name
-                extracted_folder = None
-                # Use the name from config if available, else fallback to user input
-                if self.config.get() and os.path.exists(self.config.get()):
-                    with open(self.config.get(), "r", encoding="utf-8") as f:
-                        config_data = json.load(f)
-                    extracted_folder = normalize(config_data.get("title", "character"))
-                else:
-                    extracted_folder = normalize(self.modelNameVar.get())
-                model_dir = os.path.join(self.outputPath.get(), normalize(self.modelNameVar.get()))
-                # Pass the custom name for renaming if needed
-                manager.SetupModel(model_dir, self.modelNameVar.get())
-                manager.Log("Extraction complete!")
-                messagebox.showinfo("LPK Model Extractor", "Extraction successful!")
-            except Exception as e:
-                messagebox.showerror("LPK Model Extractor", "%s" % str(e))
-                manager.Log("Error occurred: %s\nExtraction stopped." % e)
-        else:
+        if len(self.output.get()) == 0 or len(self.input.get()) == 0:
             messagebox.showerror(
                 "LPK Model Extractor", "Missing input or output path"
             )
-        currentThread = None
+            return
+        self.addJob(jobs.Job(self.input.get(), self.output.get(), self.config.get(), self.modelNameVar.get()))
+
+    def addJob(self, job: jobs.Job):
+        self.queue.submit(job)
+        manager.Log(
+            "LPK File: %s\nOutput Path: %s"
+            % (job.lpk_path, job.output_dir)
+        )
+        row = ctk.CTkFrame(self.jobList)
+        row.grid(row=len(self.jobRows), column=0, pady=(0, 4), sticky="ew")
+        row.grid_columnconfigure(1, weight=1)
+        name = ctk.CTkLabel(row, text=job.model_name, width=140, anchor="w")
+        progress = ctk.CTkProgressBar(row, width=180)
+        progress.set(0)
+        status = ctk.CTkLabel(row, text=job.status, width=110)
+        cancel = ctk.CTkButton(row, text="Cancel", width=60, command=lambda: self.queue.cancel(job))
+        name.grid(row=0, column=0, padx=(6, 0))
+        progress.grid(row=0, column=1, padx=6, sticky="ew")
+        status.grid(row=0, column=2)
+        cancel.grid(row=0, column=3, padx=(0, 6))
+        self.jobRows[job] = (progress, status, cancel)
+
+    def poll(self):
+        # worker threads never touch widgets, job state is copied into the UI here
+        manager.FlushLog()
+        for job, (progress, status, cancel) in self.jobRows.items():
+            # every set redraws the bar
+            if progress.get() != job.progress:
+                progress.set(job.progress)
+            text = job.stage if job.status == jobs.RUNNING and job.stage else job.status
+            if status.cget("text") != text:
+                status.configure(text=text)
+            if job.status in [jobs.DONE, jobs.FAILED, jobs.CANCELLED] and cancel.cget("state") != "disabled":
+                cancel.configure(state="disabled")
+        self.after(POLL_MS, self.poll)
 
 
 if __name__ == '__main__':
+    # motion rewriting uses a process pool, needed for frozen builds on Windows
+    multiprocessing.freeze_support()
     w = Win()
     w.mainloop()
@@ -1,15 +1,23 @@
 import json
 import os.path
+import queue
 import re
 import shutil
+import struct
 import subprocess
-from tkinter import Text, NORMAL, DISABLED, END
+from typing import TYPE_CHECKING
 
+import manifest
 import motion_spec
+from Core.profiling import profiler
 from Core.utils import normalize, safe_mkdir  # Use updated utils
 
+if TYPE_CHECKING:
+    from tkinter import Text
 
-LogArea: Text | None = None
+
+LogArea: "Text | None" = None
+LogQueue: queue.SimpleQueue = queue.SimpleQueue()
 
 
 def rmdir(path):
@@ -24,8 +32,26 @@ def rmdir(path):
 
 def Log(info):
     global LogArea
+    # without a GUI attached (library / batch use) fall back to stdout
+    if LogArea is None:
+        print(info)
+        return
+    # jobs log from worker threads, the widget is only written by FlushLog on the Tk thread
+    LogQueue.put(info)
+
+
+def FlushLog():
+    global LogArea
+    lines = []
+    while True:
+        try:
+            lines.append(LogQueue.get_nowait())
+        except queue.Empty:
+            break
+    if not lines or LogArea is None:
+        return
     LogArea.configure(state="normal")
-    LogArea.insert("end", info + "\n")
+    LogArea.insert("end", "\n".join(lines) + "\n")
     LogArea.see("end")
     LogArea.configure(state="disabled")
 
@@ -66,6 +92,20 @@ def organize_assets(model_dir: str):
                 Log(f"Moved sound file: {fname} -> sounds/")
 
 
+def texture_width(path: str) -> int:
+    """
+    Width of a texture image. PNG headers are parsed directly, Pillow is only imported for other formats.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+    # PNG signature followed by the IHDR chunk, width is the first big-endian uint32
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">I", head[16:20])[0]
+    import PIL.Image
+    with PIL.Image.open(path) as img:
+        return img.width
+
+
 def organize_textures(model_dir: str, model_json_path: str, character_name: str):
     """
     Move texture files to a folder named <character>.<resolution> and update model3.json texture paths.
@@ -76,10 +116,7 @@ def organize_textures(model_dir: str, model_json_path: str, character_name: str)
         return
 
     # Determine resolution from the first texture file
-    import PIL.Image
-    first_texture_path = os.path.join(model_dir, texture_files[0])
-    with PIL.Image.open(first_texture_path) as img:
-        resolution = img.width  # Assuming square textures
+    resolution = texture_width(os.path.join(model_dir, texture_files[0]))  # Assuming square textures
 
     texture_folder = f"{character_name}.{resolution}"
     texture_folder_path = os.path.join(model_dir, texture_folder)
@@ -112,10 +149,7 @@ def organize_textures_for_all_models(model_dir: str, character_name: str):
         return
 
     # Determine resolution from the first texture file
-    import PIL.Image
-    first_texture_path = os.path.join(model_dir, texture_files[0])
-    with PIL.Image.open(first_texture_path) as img:
-        resolution = img.width  # Assuming square textures
+    resolution = texture_width(os.path.join(model_dir, texture_files[0]))  # Assuming square textures
 
     texture_folder = f"{character_name}.{resolution}"
     texture_folder_path = os.path.join(model_dir, texture_folder)
@@ -152,7 +186,44 @@ def CheckPath(model_dir: str):
     return motionPath, soundPath
 
 
-def SetupModel(model_dir: str, modelNameBase: str = None):
+def motion_file_name(_File: str, modelName: str) -> str:
+    """
+    Final file name (inside motions/) of an extracted motion json.
+    """
+    return _File.replace("FileReferences_Motions", modelName).replace("_File_0", "").replace(".json", ".motion3.json")
+
+
+def sound_file_name(_Sound: str, modelName: str, ext: str = ".wav") -> str:
+    """
+    Final file name (inside sounds/) of an extracted motion sound.
+    """
+    fileName = _Sound.replace("FileReferences_Motions", modelName).replace("_Sound_0", "")
+    return os.path.splitext(fileName)[0] + ext
+
+
+def link_hit_areas(x: dict):
+    """
+    Link hitAreas with motion groups in a model3.json dict.
+    """
+    for idx, hitArea in enumerate(x.get("HitAreas", [])):
+        if hitArea.get("Motion", None) is not None:
+            x["HitAreas"][idx]["Name"] = hitArea["Motion"].split(":")[0]
+
+    if x.get("Controllers", None) is not None:
+        if x["Controllers"].get("ParamHit", None) is not None:
+            if x["Controllers"]["ParamHit"].get("Items", None) is not None:
+                for idx2, item in enumerate(x["Controllers"]["ParamHit"]["Items"]):
+                    if item.get("EndMtn", None) is not None:
+                        x["HitAreas"].append(
+                            {
+                                "Name": item.get("EndMtn"),
+                                "Id": item.get("Id")
+                            }
+                        )
+
+
+@profiler.profiled("SetupModel")
+def SetupModel(model_dir: str, modelNameBase: str = None, writeManifest: bool = True, compactMotions: bool = False):
     motionPath, soundPath = CheckPath(model_dir)
     if not modelNameBase:
         modelNameBase = os.path.split(model_dir)[-1]
@@ -164,6 +235,11 @@ def SetupModel(model_dir: str, modelNameBase: str = None):
 
     Log("Model Json Found: %s" % modelJsonPathList)
     removeList = list()
+    models = list()
+    # motions of every model json are rewritten together in one batch,
+    # keyed by target so a motion reused by several groups is written once
+    motionJobs = dict()
+    motionRefs = list()
     for idx, modelJsonPath in enumerate(modelJsonPathList):
         modelName = normalize(modelNameBase + ("" if idx == 0 else str(idx+1)))
         x = json.load(open(modelJsonPath, 'r', encoding='utf-8'))
@@ -176,27 +252,15 @@ def SetupModel(model_dir: str, modelNameBase: str = None):
                 # motions/*.motion3.json
                 if _File:
                     srcPath = os.path.join(model_dir, _File)
-                    fileName = _File.replace("FileReferences_Motions", modelName).replace("_File_0", "").replace(".json", ".motion3.json")
+                    fileName = motion_file_name(_File, modelName)
                     targetPath = os.path.join(motionPath, fileName)
-                    src = json.load(open(srcPath, 'r', encoding='utf-8'))
-                    Log("CurveCount: %d" % src["Meta"]["CurveCount"])
-                    Log("TotalSegmentCount: %d" % src["Meta"]["TotalSegmentCount"])
-                    Log("TotalPointCount: %d" % src["Meta"]["TotalPointCount"])
-                    with open(targetPath, 'w', encoding='utf-8') as f:
-                        curve_count, segment_count, point_count = motion_spec.recount_motion(src)
-                        Log("%d, %d, %d" % (curve_count, segment_count, point_count))
-                        src["Meta"]["CurveCount"] = curve_count
-                        src["Meta"]["TotalSegmentCount"] = segment_count
-                        src["Meta"]["TotalPointCount"] = point_count
-                        json.dump(src, f, ensure_ascii=False, indent=2)
+                    motionJobs[targetPath] = srcPath
+                    motionRefs.append((motion, "motions/" + fileName))
                     removeList.append(srcPath)
-                    Log("[Motion]: %s >>> %s" % (_File, targetPath))
-                    x["FileReferences"]["Motions"][groupName][idx]["File"] = "motions/" + fileName
                 # sounds/*.wav
                 if _Sound:
                     srcPath = os.path.join(model_dir, _Sound)
-                    fileName = _Sound.replace("FileReferences_Motions", modelName).replace("_Sound_0", "")
-                    fileName = os.path.splitext(fileName)[0] + ".wav"
+                    fileName = sound_file_name(_Sound, modelName)
                     targetPath = os.path.join(soundPath, fileName)
                     # Use system ffmpeg instead of embedded
                     cmd = "ffmpeg -i \"%s\" -ac 1 \"%s\" -y -v quiet" % (srcPath, targetPath)
@@ -216,22 +280,18 @@ def SetupModel(model_dir: str, modelNameBase: str = None):
                         removeList.append(srcPath)
                     Log("[Sound]: %s >>> %s" % (_Sound, targetPath))
                     x["FileReferences"]["Motions"][groupName][idx]["Sound"] = "sounds/" + fileName
-        # link hitAreas with motion groups
-        for idx, hitArea in enumerate(x.get("HitAreas", [])):
-            if hitArea.get("Motion", None) is not None:
-                x["HitAreas"][idx]["Name"] = hitArea["Motion"].split(":")[0]
-
-        if x.get("Controllers", None) is not None:
-            if x["Controllers"].get("ParamHit", None) is not None:
-                if x["Controllers"]["ParamHit"].get("Items", None) is not None:
-                    for idx2, item in enumerate(x["Controllers"]["ParamHit"]["Items"]):
-                        if item.get("EndMtn", None) is not None:
-                            x["HitAreas"].append(
-                                {
-                                    "Name": item.get("EndMtn"),
-                                    "Id": item.get("Id")
-                                }
-                            )
+        models.append((x, modelName))
+
+    motionJobs = [(srcPath, targetPath) for targetPath, srcPath in motionJobs.items()]
+    counts = motion_spec.rewrite_motions(motionJobs, compactMotions)
+    for (srcPath, targetPath), (curve_count, segment_count, point_count) in zip(motionJobs, counts):
+        Log("[Motion]: %s >>> %s (%d curves, %d segments, %d points)"
+            % (os.path.basename(srcPath), targetPath, curve_count, segment_count, point_count))
+    for motion, path in motionRefs:
+        motion["File"] = path
+
+    for x, modelName in models:
+        link_hit_areas(x)
         # save changes to model3.json
         model3_path = os.path.join(model_dir, modelName + ".model3.json")
         with open(model3_path, "w", encoding='utf-8') as f:
@@ -262,4 +322,9 @@ def SetupModel(model_dir: str, modelNameBase: str = None):
         if os.path.exists(new_dir):
             rmdir(new_dir)
         os.rename(model_dir, new_dir)
-        model_dir = new_dir  # Update model_dir to new location
\ No newline at end of file
+        model_dir = new_dir  # Update model_dir to new location
+
+    # Content-hashed list of final outputs, used to build delta bundles
+    if writeManifest:
+        Log("Manifest: %s" % manifest.write_manifest(model_dir))
+    return model_dir
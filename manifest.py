@@ -0,0 +1,136 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import zipfile
+
+MANIFEST_NAME = "manifest.json"
+DELTA_NAME = "delta.json"
+CHUNK_SIZE = 1024 * 1024
+# model level jsons keep the name LpkLoader.name_change gives them, e.g. Physics_0.json
+NAMED_JSON = re.compile(r"^(Physics|Pose|UserData|DisplayInfo)_\d+\.json$")
+
+
+def hash_file(path: str) -> str:
+    """
+    sha256 of a file, read in chunks so large textures are never fully loaded.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_type(path: str) -> str:
+    name = path.lower()
+    if name.endswith(".model3.json"):
+        return "model"
+    if name.endswith(".motion3.json"):
+        return "motion"
+    if name.endswith(".moc3"):
+        return "moc"
+    named = NAMED_JSON.match(os.path.basename(path))
+    if named:
+        return named.group(1).lower()
+    if name.startswith("expressions/"):
+        return "expression"
+    if name.endswith((".wav", ".ogg", ".mp3")):
+        return "sound"
+    if name.endswith((".png", ".jpg", ".jpeg")):
+        return "texture"
+    return "other"
+
+
+def build_manifest(model_dir: str, workers: int = None) -> dict:
+    """
+    Describe every file under model_dir with its path, size, content hash and type.
+    Files are hashed on a thread pool; hashlib releases the GIL while digesting.
+    """
+    paths = []
+    for root, _, files in os.walk(model_dir):
+        for fname in files:
+            rel = os.path.relpath(os.path.join(root, fname), model_dir).replace(os.sep, "/")
+            if rel != MANIFEST_NAME:
+                paths.append(rel)
+    paths.sort()
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(hash_file, [os.path.join(model_dir, p) for p in paths]))
+
+    files = []
+    for rel, digest in zip(paths, hashes):
+        files.append({
+            "path": rel,
+            "size": os.path.getsize(os.path.join(model_dir, rel)),
+            "hash": digest,
+            "type": file_type(rel),
+        })
+    return {"algorithm": "sha256", "files": files}
+
+
+def write_manifest(model_dir: str, workers: int = None) -> str:
+    manifest = build_manifest(model_dir, workers)
+    manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest_path
+
+
+def load_manifest(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def diff_manifests(old: dict, new: dict):
+    """
+    Return (changed, deleted): entries of new that are added or modified, and paths only in old.
+    """
+    old_files = {e["path"]: e for e in old.get("files", [])}
+    new_files = {e["path"]: e for e in new.get("files", [])}
+    changed = [e for p, e in new_files.items()
+               if p not in old_files or old_files[p]["hash"] != e["hash"]]
+    deleted = sorted(p for p in old_files if p not in new_files)
+    return changed, deleted
+
+
+def make_delta(old_manifest: str, model_dir: str, output: str):
+    """
+    Write a zip bundle with the files of model_dir that differ from old_manifest.
+    The bundle carries delta.json (deletion list) and the new manifest.json.
+    """
+    new = load_manifest(os.path.join(model_dir, MANIFEST_NAME))
+    changed, deleted = diff_manifests(load_manifest(old_manifest), new)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for e in changed:
+            # textures and sounds are already compressed
+            compress = zipfile.ZIP_STORED if e["type"] in ["texture", "sound"] else zipfile.ZIP_DEFLATED
+            bundle.write(os.path.join(model_dir, e["path"]), e["path"], compress_type=compress)
+        bundle.writestr(DELTA_NAME, json.dumps({
+            "changed": [e["path"] for e in changed],
+            "deleted": deleted,
+        }, ensure_ascii=False, indent=2))
+        bundle.writestr(MANIFEST_NAME, json.dumps(new, ensure_ascii=False, indent=2))
+    print(f"delta: {len(changed)} changed, {len(deleted)} deleted -> {output}")
+    return changed, deleted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build manifests and delta bundles of converted models")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="write manifest.json into a model directory")
+    p.add_argument("model_dir")
+    p = sub.add_parser("delta", help="bundle files that changed since an older manifest")
+    p.add_argument("old_manifest")
+    p.add_argument("model_dir")
+    p.add_argument("-o", "--output", default="delta.zip")
+    args = parser.parse_args()
+    if args.command == "build":
+        print(write_manifest(args.model_dir))
+    else:
+        make_delta(args.old_manifest, args.model_dir, args.output)
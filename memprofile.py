@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import zipfile
+
+import jobs
+import manager
+from Core.lpk_loader import LpkLoader
+from Core.profiling import format_bytes, profiler
+from Core.utils import normalize
+
+
+def largest_member(lpkpath: str) -> int:
+    with zipfile.ZipFile(lpkpath) as z:
+        return max((info.file_size for info in z.infolist()), default=0)
+
+
+def profile(lpkpath: str, outputdir: str, configpath: str = "", model_name: str = None) -> dict:
+    """
+    Extract and set up one pack with the memory profiler enabled.
+    """
+    model_name = model_name or jobs.model_name_for(lpkpath, configpath)
+    profiler.enable()
+    try:
+        loader = LpkLoader(lpkpath, configpath)
+        loader.extract(outputdir, model_name)
+        manager.SetupModel(os.path.join(outputdir, normalize(model_name)), model_name)
+    finally:
+        profiler.disable()
+    return {
+        "largest_member": largest_member(lpkpath),
+        "peak_traced": profiler.peak_traced,
+        "peak_rss": profiler.peak_rss,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extract a pack and report peak memory per pipeline stage")
+    parser.add_argument("lpk")
+    parser.add_argument("output")
+    parser.add_argument("--config", default=None, help="config.json, defaults to the one next to the pack")
+    parser.add_argument("--name", default=None, help="model name")
+    parser.add_argument("--max-ratio", type=float, default=None,
+                        help="exit with status 1 when peak traced memory exceeds this multiple of the largest member")
+    args = parser.parse_args()
+    config = jobs.find_config(args.lpk) if args.config is None else args.config
+    result = profile(args.lpk, args.output, config, args.name)
+    print(profiler.report())
+    ratio = result["peak_traced"] / max(result["largest_member"], 1)
+    print(f"largest member: {format_bytes(result['largest_member'])}, peak/largest: {ratio:.2f}")
+    if args.max_ratio is not None and ratio > args.max_ratio:
+        print(f"peak memory exceeds {args.max_ratio}x the largest member")
+        sys.exit(1)
@@ -1,4 +1,10 @@
-from Core.utils import travels_dict, travels_list  # Use updated utils
+import json
+
+from Core import parallel
+
+# below this many motions starting (spawning) a process pool costs more than it saves
+POOL_MIN_JOBS = 64
+
 
 def recount_motion(motion: dict) -> tuple[int, int, int]:
     """
@@ -23,3 +29,42 @@ def recount_motion(motion: dict) -> tuple[int, int, int]:
                 v += 7
             segment_count += 1
     return curve_count, segment_count, point_count
+
+
+def update_motion_meta(motion: dict) -> tuple[int, int, int]:
+    """
+    recount a motion3.json dict and write the counts back into its Meta
+    """
+    curve_count, segment_count, point_count = recount_motion(motion)
+    motion["Meta"]["CurveCount"] = curve_count
+    motion["Meta"]["TotalSegmentCount"] = segment_count
+    motion["Meta"]["TotalPointCount"] = point_count
+    return curve_count, segment_count, point_count
+
+
+
+def rewrite_motion(srcPath: str, targetPath: str, compact: bool = False) -> tuple[int, int, int]:
+    """
+    parse a motion json, recount its Meta and write it to targetPath
+    """
+    with open(srcPath, 'r', encoding='utf-8') as f:
+        src = json.load(f)
+    counts = update_motion_meta(src)
+    with open(targetPath, 'w', encoding='utf-8') as f:
+        if compact:
+            json.dump(src, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(src, f, ensure_ascii=False, indent=2)
+    return counts
+
+
+def rewrite_motions(jobs: list, compact: bool = False, workers: int = None) -> list:
+    """
+    rewrite_motion for every (srcPath, targetPath) pair, on a process pool for large batches.
+    returns the recounted values in job order
+    """
+    workers = workers or parallel.workers()
+    if len(jobs) < POOL_MIN_JOBS or workers == 1:
+        return [rewrite_motion(src, target, compact) for src, target in jobs]
+    with parallel.process_pool(workers) as pool:
+        return list(pool.map(rewrite_motion, *zip(*jobs), [compact] * len(jobs), chunksize=8))
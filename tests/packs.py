@@ -0,0 +1,56 @@
+import json
+import os
+import struct
+import zipfile
+
+from Core.utils import decrypt, genkey, hashed_filename
+
+MiB = 1024 * 1024
+PACK_ID = "synthetic.pack"
+
+
+def put(z, name, data, compress=zipfile.ZIP_DEFLATED):
+    z.writestr(name, bytes(decrypt(genkey(PACK_ID + name), data)), compress_type=compress)
+
+
+def put_config(z, model_name: str = ""):
+    z.writestr(hashed_filename("config.mlve"), json.dumps({
+        "type": "STD2_0",
+        "id": PACK_ID,
+        "list": [{"character": "synthetic", "costume": [{"path": model_name}]}],
+    }))
+
+
+def build_lpk(path: str, in_memory_size: int, streamed_size: int, external_textures: list = ()):
+    """
+    STD2_0 pack: a model json referencing a moc, a texture and one motion, all encrypted
+    with genkey(id + name). ``external_textures`` are listed first but not packed.
+    """
+    def put(z, name, data, compress=zipfile.ZIP_DEFLATED):
+        z.writestr(name, bytes(decrypt(genkey(PACK_ID + name), data)), compress_type=compress)
+
+    moc = b"MOC3" + os.urandom(in_memory_size - 4)
+    png = (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+           + struct.pack(">IIBBBBB", 2048, 2048, 8, 6, 0, 0, 0))
+    png += os.urandom(streamed_size - len(png))
+    motion = {
+        "Version": 3,
+        "Meta": {"CurveCount": 0, "TotalSegmentCount": 0, "TotalPointCount": 0},
+        "Curves": [{"Target": "Parameter", "Id": "ParamAngleX", "Segments": [0, 0, 0, 1, 1]}],
+    }
+    names = {k: "%032x.bin" % i for i, k in enumerate(["model", "moc", "texture", "motion"], 1)}
+    model = {
+        "Version": 3,
+        "FileReferences": {
+            "Moc": names["moc"],
+            "Textures": [*external_textures, names["texture"]],
+            "Motions": {"Idle": [{"File": names["motion"]}]},
+        },
+    }
+    with zipfile.ZipFile(path, "w") as z:
+        # random payloads do not compress
+        put(z, names["moc"], moc, zipfile.ZIP_STORED)
+        put(z, names["texture"], png, zipfile.ZIP_STORED)
+        put(z, names["motion"], json.dumps(motion).encode())
+        put(z, names["model"], json.dumps(model).encode())
+        put_config(z, names["model"])
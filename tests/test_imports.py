@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORE_MODULES = ["manager", "Core.lpk_loader", "motion_spec"]
+# GUI toolkits and modules only needed once work actually runs
+HEAVY_MODULES = [
+    "tkinter", "customtkinter", "tkinterdnd2", "filetype", "PIL",
+    "concurrent.futures.process", "multiprocessing.shared_memory",
+]
+# generous bound, a clean import takes a few tens of milliseconds
+IMPORT_SECONDS = 1.0
+
+CHECK = """
+import json, sys, time
+start = time.perf_counter()
+for name in %r:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def test_core_imports_are_light():
+    out = subprocess.run(
+        [sys.executable, "-c", CHECK % (CORE_MODULES, HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_SECONDS
@@ -0,0 +1,52 @@
+import json
+import zipfile
+
+import manifest
+
+
+def write(path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_file_type_of_extracted_names():
+    assert manifest.file_type("Chara.model3.json") == "model"
+    assert manifest.file_type("motions/Chara_Idle_0.motion3.json") == "motion"
+    assert manifest.file_type("Moc_0.moc3") == "moc"
+    assert manifest.file_type("Physics_0.json") == "physics"
+    assert manifest.file_type("Pose_0.json") == "pose"
+    assert manifest.file_type("UserData_0.json") == "userdata"
+    assert manifest.file_type("expressions/Expressions_f01_File_0.json") == "expression"
+    assert manifest.file_type("sounds/Chara_Idle_0.wav") == "sound"
+    assert manifest.file_type("Chara.2048/Textures_0_0.png") == "texture"
+
+
+def test_delta_bundle(tmp_path):
+    model_dir = tmp_path / "Chara"
+    write(model_dir / "Physics_0.json", b"{}")
+    write(model_dir / "Chara.2048" / "Textures_0_0.png", b"old texture")
+    write(model_dir / "sounds" / "Chara_Idle_0.wav", b"removed sound")
+    old = tmp_path / "old_manifest.json"
+    old.write_text(json.dumps(manifest.build_manifest(str(model_dir))))
+
+    write(model_dir / "Chara.2048" / "Textures_0_0.png", b"new texture")
+    (model_dir / "sounds" / "Chara_Idle_0.wav").unlink()
+    write(model_dir / "motions" / "Chara_Idle_0.motion3.json", b"{}")
+    manifest.write_manifest(str(model_dir))
+
+    changed, deleted = manifest.diff_manifests(
+        manifest.load_manifest(str(old)), manifest.load_manifest(str(model_dir / manifest.MANIFEST_NAME)))
+    assert sorted(e["path"] for e in changed) == ["Chara.2048/Textures_0_0.png", "motions/Chara_Idle_0.motion3.json"]
+    assert deleted == ["sounds/Chara_Idle_0.wav"]
+
+    bundle_path = tmp_path / "delta.zip"
+    manifest.make_delta(str(old), str(model_dir), str(bundle_path))
+    with zipfile.ZipFile(bundle_path) as bundle:
+        delta = json.loads(bundle.read(manifest.DELTA_NAME))
+        assert sorted(delta["changed"]) == ["Chara.2048/Textures_0_0.png", "motions/Chara_Idle_0.motion3.json"]
+        assert delta["deleted"] == ["sounds/Chara_Idle_0.wav"]
+        assert bundle.read("Chara.2048/Textures_0_0.png") == b"new texture"
+        # unchanged files are left out of the bundle
+        assert "Physics_0.json" not in bundle.namelist()
+        new = json.loads(bundle.read(manifest.MANIFEST_NAME))
+        assert {e["path"]: e["type"] for e in new["files"]}["Physics_0.json"] == "physics"
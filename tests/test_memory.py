@@ -0,0 +1,61 @@
+import json
+import os
+import tracemalloc
+import zipfile
+
+import memprofile
+from Core import scheduler
+from Core.lpk_loader import LpkLoader
+from packs import MiB, build_lpk, put, put_config
+
+# peak traced memory allowed per byte of the largest member
+MAX_PEAK_RATIO = 3.0
+
+
+def test_peak_memory_bounded_by_largest_member(tmp_path):
+    in_memory_size = 6 * MiB
+    streamed_size = scheduler.STREAM_THRESHOLD + MiB
+    lpk = str(tmp_path / "synthetic.lpk")
+    build_lpk(lpk, in_memory_size, streamed_size)
+
+    result = memprofile.profile(lpk, str(tmp_path / "out"), "", "synthetic")
+
+    assert result["largest_member"] == streamed_size
+    assert result["peak_traced"] / result["largest_member"] < MAX_PEAK_RATIO
+    # the streamed member is never held whole, the peak comes from the in-memory one
+    assert result["peak_traced"] < streamed_size
+    assert result["peak_traced"] < MAX_PEAK_RATIO * in_memory_size
+    model_dir = tmp_path / "out" / "synthetic"
+    assert (model_dir / "synthetic.model3.json").exists()
+    assert (model_dir / "synthetic.2048" / "Textures_0_0.png").stat().st_size == streamed_size
+
+
+def test_streamed_member_checked_for_json_only_when_it_can_be_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "STREAM_THRESHOLD", MiB)
+    unknown = b"\x00UNKNOWN" + os.urandom(8 * MiB)
+    document = b"\xef\xbb\xbf \n" + json.dumps({"Curves": [{"Segments": list(range(200000))}]}).encode()
+    lpk = str(tmp_path / "streamed.lpk")
+    with zipfile.ZipFile(lpk, "w") as z:
+        put(z, "unknown.bin", unknown, zipfile.ZIP_STORED)
+        put(z, "document.bin", document)
+        put_config(z)
+
+    budget = scheduler.MemoryBudget()
+    loader = LpkLoader(lpk, "", budget)
+    tracemalloc.start()
+    try:
+        _, suffix = loader.recovery("unknown.bin", str(tmp_path / "unknown"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert suffix == ""
+    # decrypted chunk by chunk, never read back whole
+    assert peak < len(unknown) / 2
+    assert budget.peak_bytes == scheduler.member_cost(len(unknown))
+    assert (tmp_path / "unknown").read_bytes() == unknown
+
+    _, suffix = loader.recovery("document.bin", str(tmp_path / "document"))
+    assert suffix == ".json"
+    # loading the whole member is reserved up front
+    assert budget.peak_bytes == scheduler.json_cost(len(document))
+    assert (tmp_path / "document.json").read_bytes() == document
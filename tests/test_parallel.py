@@ -0,0 +1,54 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from Core import parallel, scheduler
+from Core.lpk_loader import LpkLoader
+from Core.utils import decrypt, genkey, hashed_filename
+
+PACK_ID = "parallel.pack"
+RANGE_SIZE = 4096
+# empty, shorter than a block, exactly one range, several ranges with a partial block
+SIZES = [0, 1000, RANGE_SIZE, 3 * RANGE_SIZE + 123]
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    # every member takes the parallel path on two workers, whatever the machine
+    monkeypatch.setattr(parallel, "PARALLEL_THRESHOLD", 0)
+    monkeypatch.setattr(parallel, "RANGE_SIZE", RANGE_SIZE)
+    monkeypatch.setattr(parallel, "workers", lambda: 2)
+    # the streaming path decrypts its first chunk itself, the workers take the rest
+    monkeypatch.setattr(scheduler, "STREAM_CHUNK", 1024)
+
+
+@pytest.fixture
+def loader(tmp_path):
+    lpk = str(tmp_path / "parallel.lpk")
+    with zipfile.ZipFile(lpk, "w") as z:
+        for size in SIZES:
+            name = f"{size}.bin"
+            z.writestr(name, os.urandom(size))
+        z.writestr(hashed_filename("config.mlve"), json.dumps({"type": "STD2_0", "id": PACK_ID, "list": []}))
+    return LpkLoader(lpk, "")
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_decrypt_parallel_matches_serial(small_ranges, loader, size):
+    name = f"{size}.bin"
+    key = genkey(PACK_ID + name)
+    expected = decrypt(key, loader.lpkfile.read(name))
+    with loader.lpkfile.open(name) as f:
+        assert parallel.decrypt_parallel(key, f, size) == expected
+    assert loader.decrypt_file(name) == expected
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_stream_decrypt_parallel_matches_serial(small_ranges, loader, tmp_path, size):
+    name = f"{size}.bin"
+    expected = decrypt(genkey(PACK_ID + name), loader.lpkfile.read(name))
+    output = tmp_path / name
+    loader.stream_decrypt(name, str(output))
+    assert output.read_bytes() == expected
@@ -0,0 +1,35 @@
+import os
+
+import manager
+from Core.lpk_loader import LpkLoader
+from Core.utils import normalize
+from lpk_vfs import LpkVirtualFS
+from packs import build_lpk
+
+# changed by normalize, SetupModel still names the texture folder from it as given
+MODEL_NAME = "Chara: one?"
+
+
+def extracted_files(lpk: str, outputdir: str) -> set:
+    LpkLoader(lpk, "").extract(outputdir, MODEL_NAME)
+    model_dir = manager.SetupModel(os.path.join(outputdir, normalize(MODEL_NAME)), MODEL_NAME, writeManifest=False)
+    return {os.path.relpath(os.path.join(root, f), model_dir).replace(os.sep, "/")
+            for root, _, files in os.walk(model_dir) for f in files}
+
+
+def test_paths_mirror_extracted_layout(tmp_path):
+    lpk = str(tmp_path / "synthetic.lpk")
+    build_lpk(lpk, 64 * 1024, 128 * 1024)
+    vfs = LpkVirtualFS(lpk, "", MODEL_NAME)
+
+    assert "Chara: one?.2048/Textures_0_0.png" in vfs.listdir()
+    assert set(vfs.listdir()) <= extracted_files(lpk, str(tmp_path / "out"))
+
+
+def test_texture_folder_from_first_packed_texture(tmp_path):
+    lpk = str(tmp_path / "synthetic.lpk")
+    build_lpk(lpk, 64 * 1024, 128 * 1024, external_textures=["external.png"])
+    vfs = LpkVirtualFS(lpk, "", MODEL_NAME)
+
+    assert "Chara: one?.2048/Textures_1_0.png" in vfs.listdir()
+    assert not any(path.startswith("None/") for path in vfs.listdir())